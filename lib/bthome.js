@@ -0,0 +1,148 @@
+/**
+ * BTHome v2 decoding helpers shared by the ble/*.shelly.js examples.
+ *
+ * Not a standalone script: pull it into a script with
+ *   // @include "lib/bthome.js"
+ * and build the deployable file with tools/bundle-script.py. Only the
+ * declarations the script actually references end up in the bundle.
+ */
+
+const ALLTERCO_MFD_ID_STR = "0ba9";
+const BTHOME_SVC_ID_STR = "fcd2";
+
+const uint8 = 0;
+const int8 = 1;
+const uint16 = 2;
+const int16 = 3;
+const uint24 = 4;
+const int24 = 5;
+const dimmert = 6; // special data type for dimmer event
+
+// The BTH object defines the structure of the BTHome data
+const BTH = {
+  0x00: { n: "pid", t: uint8 },
+  0x01: { n: "battery", t: uint8, u: "%" },
+  0x02: { n: "temperature", t: int16, f: 0.01, u: "tC" },
+  0x04: { n: "atm. pressure", t: int24, f: 0.01, u: "hPa" },
+  0x03: { n: "humidity", t: uint16, f: 0.01, u: "%" },
+  0x05: { n: "illuminance", t: uint24, f: 0.01 },
+  0x08: { n: "dew point", t: uint16, f: 0.01, u: "tC" },
+  0x0C: { n: "capacitor voltage", t: uint16, f: 0.001, u: "V" },
+  0x20: { n: "raining", t: uint8},
+  0x21: { n: "motion", t: uint8 },
+  0x2d: { n: "window", t: uint8 },
+  0x2e: { n: "humidity", t: uint8, u: "%" },
+  0x3a: { n: "button", t: uint8 },
+  0x3c: { n: "dimmer", t: dimmert },
+  0x3f: { n: "rotation", t: int16, f: 0.1 },
+  0x44: { n: "wind speed", t: int16, f: 0.01, u: "m/s" },
+  0x45: { n: "temperature", t: int16, f: 0.1, u: "tC" },
+  0x46: { n: "UV index", t: int8, f: 0.1 },
+  0x5E: { n: "wind direction", t: int16, f: 0.01 },
+  0x5F: { n: "precipitation", t: int16, f: 0.1, u: "mm" },
+  0x60: { n: "channel", t: uint8 },
+};
+
+function getByteSize(type) {
+  if (type === uint8 || type === int8) return 1;
+  if (type === uint16 || type === int16 || type === dimmert) return 2;
+  if (type === uint24 || type === int24) return 3;
+  //impossible as advertisements are much smaller;
+  return 255;
+}
+
+// functions for decoding and unpacking the service data from Shelly BLU devices
+const BTHomeDecoder = {
+  utoi: function (num, bitsz) {
+    const mask = 1 << (bitsz - 1);
+    return num & mask ? num - (1 << bitsz) : num;
+  },
+  getUInt8: function (buffer) {
+    return buffer.at(0);
+  },
+  getDimmer: function (buffer) {
+    return {"dimmer": buffer.at(0), "dimmersteps": buffer.at(1)};
+  },
+  getInt8: function (buffer) {
+    return this.utoi(this.getUInt8(buffer), 8);
+  },
+  getUInt16LE: function (buffer) {
+    return 0xffff & ((buffer.at(1) << 8) | buffer.at(0));
+  },
+  getInt16LE: function (buffer) {
+    return this.utoi(this.getUInt16LE(buffer), 16);
+  },
+  getUInt24LE: function (buffer) {
+    return (
+      0x00ffffff & ((buffer.at(2) << 16) | (buffer.at(1) << 8) | buffer.at(0))
+    );
+  },
+  getInt24LE: function (buffer) {
+    return this.utoi(this.getUInt24LE(buffer), 24);
+  },
+  getBufValue: function (type, buffer) {
+    if (buffer.length < getByteSize(type)) return null;
+    let res = null;
+    if (type === uint8) res = this.getUInt8(buffer);
+    if (type === int8) res = this.getInt8(buffer);
+    if (type === uint16) res = this.getUInt16LE(buffer);
+    if (type === int16) res = this.getInt16LE(buffer);
+    if (type === uint24) res = this.getUInt24LE(buffer);
+    if (type === int24) res = this.getInt24LE(buffer);
+    if (type === dimmert) res = this.getDimmer(buffer);
+    return res;
+  },
+
+  // Unpacks the service data buffer from a Shelly BLU device
+  unpack: function (buffer) {
+    //beacons might not provide BTH service data
+    if (typeof buffer !== "string" || buffer.length === 0) return null;
+    let result = {};
+    let _dib = buffer.at(0);
+    result["encryption"] = _dib & 0x1 ? true : false;
+    result["BTHome_version"] = _dib >> 5;
+    if (result["BTHome_version"] !== 2) return null;
+    //can not handle encrypted data
+    if (result["encryption"]) return result;
+    buffer = buffer.slice(1);
+
+    let _bth;
+    let _value;
+    while (buffer.length > 0) {
+      _bth = BTH[buffer.at(0)];
+      if (typeof _bth === "undefined") {
+        console.log("BTH: Unknown type");
+        break;
+      }
+      buffer = buffer.slice(1);
+      _value = this.getBufValue(_bth.t, buffer);
+
+      //handle dimmer special case
+      if (typeof _value === "object" && _bth.t === dimmert) {
+        result["dimmersteps"] = _value["dimmersteps"];
+        _value = _value["dimmer"];
+      }
+
+      if (_value === null) break;
+      if (typeof _bth.f !== "undefined") _value = _value * _bth.f;
+
+      if (typeof result[_bth.n] === "undefined") {
+        result[_bth.n] = _value;
+      }
+      else {
+        if (Array.isArray(result[_bth.n])) {
+          result[_bth.n].push(_value);
+        }
+        else {
+          result[_bth.n] = [
+            result[_bth.n],
+            _value
+          ];
+        }
+      }
+
+      buffer = buffer.slice(getByteSize(_bth.t));
+    }
+    return result;
+  },
+};
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# What it does?
+# > This script snapshots the scripts running across a fleet of Shelly devices:
+# >   1. Reads an inventory file (one device per line: "<host> [label]")
+# >   2. Concurrently calls Shelly.GetDeviceInfo, Script.List and Script.GetCode
+# >      (ranged reads) on every device
+# >   3. Stores each script body once in a content-addressed store keyed by its
+# >      SHA-256, so identical scripts across devices cost no extra space
+# >   4. Writes a per-device manifest (device info, slots, names, hashes) into a
+# >      timestamped snapshot directory
+# > With --fast, a script is first probed (size plus the first and last chunk);
+# > when the probe matches a stored object, the remaining chunks are not
+# > transferred and the manifest entry is marked "verified": false.
+
+# How to run it?
+# > python tools/backup_scripts.py inventory.txt
+# > python tools/backup_scripts.py inventory.txt --store ./fleet-backup --workers 32
+# > python tools/backup_scripts.py inventory.txt --fast
+# > Exit code 0 = all devices backed up, exit code 1 = at least one device failed
+
+# Store layout:
+# > <store>/objects/<sha[:2]>/<sha[2:]>         script bodies (UTF-8)
+# > <store>/probes.json                         probe signature -> sha
+# > <store>/snapshots/<YYYYmmdd-HHMMSS>/<label>.json  per-device manifests
+# >   (a second run within the same second gets a "-2", "-3", ... suffix)
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import hashlib
+import json
+import os
+import sys
+import threading
+
+from fleet import CHUNK_SIZE, RpcError, call_rpc, decode_code, duplicate_labels, get_code_chunk, read_inventory
+
+DEFAULT_STORE = "fleet-backup"
+
+
+def sha256(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class ObjectStore:
+    """Content-addressed script store shared by all worker threads."""
+
+    def __init__(self, root):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.probes_path = os.path.join(root, "probes.json")
+        self.lock = threading.Lock()
+        self.probes = {}
+        self.new_objects = 0
+        if os.path.isfile(self.probes_path):
+            with open(self.probes_path, mode="r", encoding="utf-8") as f:
+                self.probes = json.load(f)
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def has(self, digest):
+        return os.path.isfile(self.object_path(digest))
+
+    def lookup_probe(self, signature):
+        with self.lock:
+            digest = self.probes.get(signature)
+        return digest if digest and self.has(digest) else None
+
+    def put(self, code, signature=None):
+        """Store code (once) and return its digest."""
+        digest = sha256(code)
+        path = self.object_path(digest)
+        with self.lock:
+            if signature:
+                self.probes[signature] = digest
+            if os.path.isfile(path):
+                return digest
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, mode="w", encoding="utf-8", newline="") as f:
+                f.write(code)
+            os.replace(tmp_path, path)
+            self.new_objects += 1
+        return digest
+
+    def save(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.probes_path + ".tmp"
+        with open(tmp_path, mode="w", encoding="utf-8") as f:
+            json.dump(self.probes, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.probes_path)
+
+
+def probe_signature(size, head, tail):
+    """Signature of a script by its size, first chunk and last chunk."""
+    return f"{size}:{sha256(head)}:{sha256(tail)}"
+
+
+def fetch_script(host, script_id, store, chunk_size, fast, stats):
+    """Fetch one script into the store. Returns (digest, size in bytes, probed)."""
+    head, left = get_code_chunk(host, script_id, 0, chunk_size)
+    stats.add(len(head))
+    size = len(head) + left
+    if left == 0:
+        return store.put(decode_code(script_id, head)), size, False
+
+    tail_offset = max(len(head), size - chunk_size)
+    if fast:
+        # Probe: total size, first chunk and last chunk. Scripts of up to two
+        # chunks are transferred completely by the probe anyway.
+        tail, _ = get_code_chunk(host, script_id, tail_offset, chunk_size)
+        stats.add(len(tail))
+        signature = probe_signature(size, head, tail)
+        if tail_offset == len(head):
+            return store.put(decode_code(script_id, head + tail), signature), size, False
+        digest = store.lookup_probe(signature)
+        if digest:
+            return digest, size, True
+
+    parts = [head]
+    offset = len(head)
+    while left > 0:
+        data, left = get_code_chunk(host, script_id, offset, chunk_size)
+        if not data:
+            raise RpcError(f"Script {script_id}: empty read at offset {offset} with {left} bytes left")
+        stats.add(len(data))
+        parts.append(data)
+        offset += len(data)
+    code = b"".join(parts)
+    # Full reads record the probe too, so a later --fast run can skip them
+    signature = probe_signature(size, head, code[tail_offset:])
+    return store.put(decode_code(script_id, code), signature), size, False
+
+
+class TransferStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bytes = 0
+
+    def add(self, count):
+        with self.lock:
+            self.bytes += count
+
+
+def backup_device(device, store, snapshot_dir, chunk_size, fast, stats):
+    """Back up all scripts of one device and write its manifest."""
+    host = device["host"]
+    manifest = {"host": host, "label": device["label"], "time": datetime.now().isoformat(timespec="seconds")}
+    info = call_rpc(host, "Shelly.GetDeviceInfo", {})
+    manifest["device"] = {key: info.get(key) for key in ("id", "mac", "model", "gen", "fw_id", "ver", "app")}
+    scripts = call_rpc(host, "Script.List", {}).get("scripts", [])
+
+    entries = []
+    probed = 0
+    for script in scripts:
+        digest, size, was_probed = fetch_script(host, script["id"], store, chunk_size, fast, stats)
+        probed += was_probed
+        entries.append({
+            "id": script["id"],
+            "name": script.get("name"),
+            "enable": script.get("enable"),
+            "running": script.get("running"),
+            "size": size,
+            "sha256": digest,
+            # Probe hits are matched on size and end chunks only
+            "verified": not was_probed,
+        })
+    manifest["scripts"] = entries
+
+    path = os.path.join(snapshot_dir, device["label"] + ".json")
+    with open(path, mode="w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return len(entries), sum(e["size"] for e in entries), probed
+
+
+def create_snapshot_dir(store_root):
+    """Create a new snapshot directory; runs in the same second get a suffix."""
+    base = os.path.join(store_root, "snapshots", datetime.now().strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    path = base
+    suffix = 1
+    while True:
+        try:
+            os.mkdir(path)
+            return path
+        except FileExistsError:
+            suffix += 1
+            path = f"{base}-{suffix}"
+
+
+def main():
+    argparser = ArgumentParser(description="Back up the scripts of many Shelly devices into a content-addressed store")
+    argparser.add_argument("inventory", help="Inventory file, one device per line: <host> [label]")
+    argparser.add_argument("--store", default=DEFAULT_STORE, help=f"Store directory (default: {DEFAULT_STORE})")
+    argparser.add_argument("--workers", type=int, default=16, help="Devices backed up in parallel (default: 16)")
+    argparser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help=f"Bytes per Script.GetCode read (default: {CHUNK_SIZE})")
+    argparser.add_argument("--fast", action="store_true", help="Skip scripts whose size and end chunks match a stored object")
+
+    args = argparser.parse_args()
+
+    if not os.path.isfile(args.inventory):
+        print(f"ERROR: Cannot find the file: {args.inventory}")
+        return 1
+
+    devices = read_inventory(args.inventory)
+    if not devices:
+        print(f"ERROR: No devices in inventory: {args.inventory}")
+        return 1
+
+    duplicates = duplicate_labels(devices)
+    if duplicates:
+        print(f"ERROR: Duplicate device labels in inventory: {', '.join(duplicates)}")
+        return 1
+
+    store = ObjectStore(args.store)
+    snapshot_dir = create_snapshot_dir(args.store)
+    stats = TransferStats()
+
+    errors = []
+    totals = {"devices": 0, "scripts": 0, "bytes": 0, "probed": 0}
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {
+            pool.submit(backup_device, d, store, snapshot_dir, args.chunk_size, args.fast, stats): d
+            for d in devices
+        }
+        for future, device in futures.items():
+            try:
+                count, size, probed = future.result()
+            except RpcError as e:
+                errors.append(f"{device['label']} ({device['host']}): {e}")
+                continue
+            totals["devices"] += 1
+            totals["scripts"] += count
+            totals["bytes"] += size
+            totals["probed"] += probed
+            print(f"  [OK] {device['label']}: {count} script(s), {size} bytes")
+
+    store.save()
+
+    print(f"\nFleet Backup: {snapshot_dir}")
+    print("=" * 60)
+    print(f"Devices backed up: {totals['devices']}/{len(devices)}")
+    print(f"Scripts: {totals['scripts']} ({totals['bytes']} bytes)")
+    print(f"Transferred: {stats.bytes} bytes")
+    print(f"Skipped via probe: {totals['probed']} script(s){' (unverified)' if totals['probed'] else ''}")
+    print(f"New objects in store: {store.new_objects}")
+
+    if errors:
+        print(f"\nERRORS ({len(errors)}):")
+        for error in errors:
+            print(f"  [X] {error}")
+        print(f"\n[FAIL] {len(errors)} device(s) failed")
+        return 1
+
+    print("\n[OK] All devices backed up!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# What it does?
+# > This script builds a single deployable .shelly.js file from a script that
+# > pulls shared helpers from lib/ instead of carrying hand-copied versions:
+# >   1. Resolves include directives of the form:  // @include "lib/modbus.js"
+# >      (relative to the including file first, then to the repository root)
+# >   2. Splits every included helper file into top-level declarations
+# >      (function NAME, var/let/const NAME)
+# >   3. Keeps only the declarations the script references, directly or through
+# >      other helpers (tree shaking); a declaration in the script itself wins
+# >      over a helper with the same name
+# >   4. Writes the bundle in place of the first directive and reports sizes,
+# >      optionally against the hand-copied originals (--compare)
+
+# How to run it?
+# > python tools/bundle-script.py path/to/script.shelly.js
+# > python tools/bundle-script.py path/to/script.shelly.js -o out.shelly.js --strip-comments
+# > python tools/bundle-script.py path/to/script.shelly.js --compare the_pill/MODBUS/Deye/deye.shelly.js
+# > The output keeps the source file name, so it can be uploaded directly:
+# > python tools/put_script.py <device-ip> <script-id> build/script.shelly.js
+
+from argparse import ArgumentParser
+import os
+import re
+import sys
+
+# Default paths (relative to this script's location)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_REPO_ROOT = os.path.dirname(SCRIPT_DIR)
+DEFAULT_BUILD_DIR = os.path.join(DEFAULT_REPO_ROOT, "build")
+
+INCLUDE_PATTERN = re.compile(r'^[ \t]*//[ \t]*@include[ \t]+"([^"]+)"[ \t]*$', re.MULTILINE)
+DECL_PATTERN = re.compile(r'(?:function\s+([A-Za-z_$][\w$]*)|(?:var|let|const)\s+(?=[A-Za-z_$\[{]))')
+DECLARATOR_PATTERN = re.compile(r'([A-Za-z_$][\w$]*)\s*(?:=|$)')
+IDENT_PATTERN = re.compile(r'[A-Za-z_$][\w$]*')
+
+# Characters after which a '/' starts a regex literal rather than a division
+REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+
+
+class Declaration:
+    """A top-level declaration found in a helper file."""
+
+    def __init__(self, names, source, text, code):
+        # A var/let/const statement may declare several names at once
+        self.names = names
+        self.source = source
+        self.text = text
+        self.code = code
+        self.deps = set()
+
+
+def mask_code(text, keep_line_comments=False):
+    """Return text with comments and string/regex literals blanked out.
+
+    The result has the same length and line structure as the input, so
+    offsets found in the masked text are valid in the original one. The
+    ${...} substitutions of template literals are code and stay visible.
+    """
+    out = list(text)
+    i = 0
+    n = len(text)
+    last = ""
+    # Brace depth inside each open ${...} substitution, innermost last
+    substitutions = []
+
+    def blank(start, end):
+        for k in range(start, end):
+            if out[k] != "\n":
+                out[k] = " "
+
+    def template_text(start):
+        """Blank template text from start; return (resume offset, last char)."""
+        j = start
+        while j < n:
+            if text[j] == "\\":
+                j += 2
+                continue
+            if text[j] == "`":
+                blank(start, j)
+                return j + 1, "`"
+            if text.startswith("${", j):
+                blank(start, j)
+                substitutions.append(0)
+                return j + 2, "{"
+            j += 1
+        blank(start, n)
+        return n, "`"
+
+    while i < n:
+        c = text[i]
+        nxt = text[i + 1] if i + 1 < n else ""
+        if c == "/" and nxt == "/":
+            end = text.find("\n", i)
+            end = n if end < 0 else end
+            if not keep_line_comments:
+                blank(i, end)
+            i = end
+            continue
+        if c == "/" and nxt == "*":
+            end = text.find("*/", i + 2)
+            end = n if end < 0 else end + 2
+            blank(i, end)
+            i = end
+            continue
+        if c == "`":
+            i, last = template_text(i + 1)
+            continue
+        if substitutions and c == "{":
+            substitutions[-1] += 1
+        elif substitutions and c == "}":
+            if substitutions[-1] == 0:
+                # End of a substitution: back to the template text
+                substitutions.pop()
+                i, last = template_text(i + 1)
+                continue
+            substitutions[-1] -= 1
+        if c in "\"'" or (c == "/" and (last == "" or last in REGEX_PRECEDERS)):
+            j = i + 1
+            in_class = False
+            while j < n:
+                if text[j] == "\\":
+                    j += 2
+                    continue
+                if c == "/":
+                    if text[j] == "[":
+                        in_class = True
+                    elif text[j] == "]":
+                        in_class = False
+                    elif text[j] == "/" and not in_class:
+                        break
+                    elif text[j] == "\n":
+                        break
+                elif text[j] == c:
+                    break
+                j += 1
+            # Keep the delimiters so the statement structure stays intact
+            blank(i + 1, min(j, n))
+            i = j + 1
+            last = c
+            continue
+        if not c.isspace():
+            last = c
+        i += 1
+    return "".join(out)
+
+
+def find_directives(text):
+    """Return the include directive matches that are real line comments.
+
+    Directive-like lines inside block comments, strings or template literals
+    are not includes.
+    """
+    masked = mask_code(text, keep_line_comments=True)
+    directives = []
+    for match in INCLUDE_PATTERN.finditer(text):
+        slashes = text.index("//", match.start())
+        if masked[slashes:slashes + 2] == "//":
+            directives.append(match)
+    return directives
+
+
+def find_references(code):
+    """Return identifiers used in masked code, ignoring property accesses."""
+    refs = set()
+    for match in IDENT_PATTERN.finditer(code):
+        start = match.start()
+        if start > 0 and (code[start - 1].isalnum() or code[start - 1] in "_$"):
+            continue
+        k = start - 1
+        while k >= 0 and code[k] in " \t\n":
+            k -= 1
+        if k >= 0 and code[k] == ".":
+            continue
+        refs.add(match.group(0))
+    return refs
+
+
+def leading_comment_start(text, start, floor=0):
+    """Return the offset of the comment block directly above a declaration.
+
+    Only whole comment lines are taken, never text before floor (the end of
+    the previous declaration).
+    """
+    line_start = text.rfind("\n", 0, start) + 1
+    result = max(line_start, floor)
+    while result > floor:
+        prev_end = result - 1
+        prev_start = text.rfind("\n", 0, prev_end) + 1
+        line = text[prev_start:prev_end].strip()
+        if line.startswith("//"):
+            result = prev_start
+        elif line.endswith("*/"):
+            block_start = text.rfind("/*", 0, prev_end)
+            if block_start < 0:
+                break
+            block_line = text.rfind("\n", 0, block_start) + 1
+            # A trailing comment after code (const A = 1; /* ... */) is not
+            # a comment block
+            if text[block_line:block_start].strip():
+                break
+            result = block_line
+        else:
+            break
+    return max(result, floor)
+
+
+def split_declarations(text, source):
+    """Split a helper file into its top-level declarations, in file order."""
+    masked = mask_code(text)
+    decls = []
+    depth = 0
+    i = 0
+    n = len(masked)
+    prev_end = 0
+    while i < n:
+        c = masked[i]
+        if c in "([{":
+            depth += 1
+        elif c in ")]}":
+            depth -= 1
+        elif depth == 0 and (i == 0 or masked[i - 1] in " \t\n;}"):
+            match = DECL_PATTERN.match(masked, i)
+            if match:
+                end = declaration_end(masked, match)
+                start = leading_comment_start(text, i, prev_end)
+                if match.group(1):
+                    names = [match.group(1)]
+                else:
+                    names = declarator_names(masked[match.end():end])
+                decls.append(Declaration(names, source, text[start:end], masked[i:end]))
+                i = prev_end = end
+                continue
+        i += 1
+    return decls
+
+
+def declarator_names(code):
+    """Return the names declared by the declarator list of a var/let/const.
+
+    Returns an empty list for destructuring patterns, which are not supported.
+    """
+    parts = []
+    depth = 0
+    start = 0
+    for i, c in enumerate(code):
+        if c in "([{":
+            depth += 1
+        elif c in ")]}":
+            depth -= 1
+        elif depth == 0 and c == ",":
+            parts.append(code[start:i])
+            start = i + 1
+    parts.append(code[start:].rstrip().rstrip(";"))
+
+    names = []
+    for part in parts:
+        match = DECLARATOR_PATTERN.match(part.strip())
+        if not match:
+            return []
+        names.append(match.group(1))
+    return names
+
+
+def declaration_end(masked, match):
+    """Return the offset just past the end of a top-level declaration."""
+    n = len(masked)
+    depth = 0
+    i = match.end()
+    is_function = match.group(1) is not None
+    last = ""
+    while i < n:
+        c = masked[i]
+        if c in "([{":
+            depth += 1
+        elif c in ")]}":
+            depth -= 1
+            if is_function and depth == 0 and c == "}":
+                return i + 1
+        elif depth == 0 and c == ";":
+            return i + 1
+        elif depth == 0 and c == "\n" and not is_function:
+            # Statement without a trailing semicolon: ends at the first line
+            # break that neither follows nor is followed by a continuation
+            rest = masked[i:].lstrip()
+            if last != "," and (not rest or rest[0] not in ".+-*/%=?:,&|"):
+                return i
+        if not c.isspace():
+            last = c
+        i += 1
+    return n
+
+
+def strip_comments(text):
+    """Remove comments from helper code and drop the lines they leave empty."""
+    masked = mask_code(text)
+    out = []
+    for line, masked_line in zip(text.split("\n"), masked.split("\n")):
+        code_end = len(masked_line.rstrip())
+        # Masked comments are blanked, so the last real code character marks the
+        # end of the code; string contents are blanked too, hence re-slicing the
+        # original line
+        kept = line[:code_end].rstrip() if code_end else ""
+        if kept:
+            out.append(kept)
+    return "\n".join(out)
+
+
+def resolve_include(path, including_file, repo_root):
+    """Resolve an include path relative to the including file or the repo root."""
+    candidates = [
+        os.path.join(os.path.dirname(including_file), path),
+        os.path.join(repo_root, path),
+    ]
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return os.path.normpath(candidate)
+    return None
+
+
+def load_helpers(entry_file, entry_text, repo_root, errors):
+    """Load all declarations reachable through include directives.
+
+    Returns (ordered list of helper files, dict name -> Declaration).
+    """
+    files = []
+    decls = {}
+    pending = [(entry_file, m.group(1)) for m in find_directives(entry_text)]
+    while pending:
+        including_file, path = pending.pop(0)
+        resolved = resolve_include(path, including_file, repo_root)
+        if resolved is None:
+            errors.append(f"{os.path.relpath(including_file, repo_root)}: Cannot resolve include \"{path}\"")
+            continue
+        if resolved in files:
+            continue
+        files.append(resolved)
+        with open(resolved, "r", encoding="utf-8") as f:
+            text = f.read()
+        for decl in split_declarations(text, resolved):
+            if not decl.names:
+                head = decl.code.split("\n", 1)[0].strip()
+                errors.append(f"{os.path.relpath(resolved, repo_root)}: Unsupported declaration (destructuring): {head}")
+                continue
+            for name in decl.names:
+                if name in decls:
+                    other = os.path.relpath(decls[name].source, repo_root)
+                    errors.append(f"Duplicate helper '{name}' in {os.path.relpath(resolved, repo_root)} (already in {other})")
+                    continue
+                decls[name] = decl
+        pending.extend((resolved, m.group(1)) for m in find_directives(text))
+
+    for decl in decls.values():
+        decl.deps = (find_references(decl.code) & set(decls)) - set(decl.names)
+    return files, decls
+
+
+def shake(decls, roots):
+    """Return the names of all declarations reachable from roots."""
+    used = set()
+    stack = [name for name in roots if name in decls]
+    while stack:
+        name = stack.pop()
+        if name in used:
+            continue
+        used.add(name)
+        stack.extend(decls[name].deps - used)
+    return used
+
+
+def bundle(entry_file, repo_root, strip=False):
+    """Bundle a script with the helpers it references.
+
+    Returns (bundle_text, report dict, errors list).
+    """
+    errors = []
+    with open(entry_file, "r", encoding="utf-8") as f:
+        entry_text = f.read()
+
+    files, decls = load_helpers(entry_file, entry_text, repo_root, errors)
+
+    # Directive lines are comments, so they are ignored by the reference scan
+    entry_masked = mask_code(entry_text)
+    own_names = set(name for d in split_declarations(entry_text, entry_file) for name in d.names)
+    overridden = sorted(own_names & set(decls))
+    for name in overridden:
+        del decls[name]
+    for decl in decls.values():
+        decl.deps -= set(overridden)
+
+    used = shake(decls, find_references(entry_masked) - own_names)
+
+    # Declarations naming several helpers are registered once per name
+    unique = []
+    for decl in decls.values():
+        if decl not in unique:
+            unique.append(decl)
+
+    chunks = []
+    for path in files:
+        selected = [d for d in unique if d.source == path and used.intersection(d.names)]
+        if not selected:
+            continue
+        # Statements declaring several names are kept whole
+        used.update(name for d in selected for name in d.names if name in decls)
+        code = "\n\n".join(d.text.strip() for d in selected)
+        if strip:
+            code = strip_comments(code)
+        else:
+            code = f"/* === from {os.path.relpath(path, repo_root)} === */\n\n" + code
+        chunks.append(code)
+    helper_code = "\n\n".join(chunks)
+
+    directives = find_directives(entry_text)
+    if directives:
+        parts = []
+        pos = 0
+        for idx, match in enumerate(directives):
+            parts.append(entry_text[pos:match.start()])
+            if idx == 0:
+                parts.append(helper_code)
+            pos = match.end()
+            # Drop the line break of removed directives
+            if idx > 0 and entry_text[pos:pos + 1] == "\n":
+                pos += 1
+        parts.append(entry_text[pos:])
+        output = "".join(parts)
+    else:
+        output = entry_text
+
+    report = {
+        "source": len(entry_text.encode("utf-8")),
+        "helpers_total": sum(len(d.text.encode("utf-8")) for d in unique),
+        "helpers_used": len(helper_code.encode("utf-8")),
+        "bundle": len(output.encode("utf-8")),
+        "files": files,
+        "used": sorted(used),
+        "dropped": sorted(set(decls) - used),
+        "overridden": overridden,
+    }
+    return output, report, errors
+
+
+def main():
+    argparser = ArgumentParser(description="Bundle a Shelly script with the shared helpers it references")
+    argparser.add_argument("file", help="Script containing // @include \"...\" directives")
+    argparser.add_argument(
+        "-o", "--output",
+        default=None,
+        help="Output file (default: build/<file name> in the repository root)"
+    )
+    argparser.add_argument(
+        "--repo-root",
+        default=DEFAULT_REPO_ROOT,
+        help=f"Root used to resolve include paths (default: {DEFAULT_REPO_ROOT})"
+    )
+    argparser.add_argument("--strip-comments", action="store_true", help="Drop comments from the included helper code")
+    argparser.add_argument(
+        "--compare",
+        nargs="+",
+        default=[],
+        metavar="FILE",
+        help="Hand-copied original(s) to compare the bundle size against"
+    )
+
+    args = argparser.parse_args()
+
+    if not os.path.isfile(args.file):
+        print(f"ERROR: Cannot find the file: {args.file}")
+        return 1
+
+    repo_root = os.path.abspath(args.repo_root)
+    entry_file = os.path.abspath(args.file)
+    output, report, errors = bundle(entry_file, repo_root, strip=args.strip_comments)
+
+    if errors:
+        print(f"\nERRORS ({len(errors)}):")
+        for error in errors:
+            print(f"  [X] {error}")
+        print(f"\n[FAIL] Found {len(errors)} error(s)")
+        return 1
+
+    out_path = args.output or os.path.join(DEFAULT_BUILD_DIR, os.path.basename(args.file))
+    out_dir = os.path.dirname(os.path.abspath(out_path))
+    os.makedirs(out_dir, exist_ok=True)
+    with open(out_path, mode="w", encoding="utf-8") as f:
+        f.write(output)
+
+    print(f"\nBundle: {args.file} -> {out_path}")
+    print("=" * 60)
+    for path in report["files"]:
+        print(f"Included: {os.path.relpath(path, repo_root)}")
+    print(f"Helpers kept ({len(report['used'])}): {', '.join(report['used']) or '-'}")
+    print(f"Helpers dropped ({len(report['dropped'])}): {', '.join(report['dropped']) or '-'}")
+    if report["overridden"]:
+        print(f"Overridden by script ({len(report['overridden'])}): {', '.join(report['overridden'])}")
+
+    print(f"\nSizes (bytes):")
+    print(f"  Source script:           {report['source']}")
+    print(f"  Helpers available:       {report['helpers_total']}")
+    print(f"  Helpers included:        {report['helpers_used']}")
+    print(f"  Bundle:                  {report['bundle']}")
+
+    for original in args.compare:
+        if not os.path.isfile(original):
+            print(f"  [!] Cannot find the file: {original}")
+            continue
+        size = os.path.getsize(original)
+        delta = report["bundle"] - size
+        pct = (delta * 100.0 / size) if size else 0.0
+        print(f"  vs {original}: {size} ({delta:+d}, {pct:+.1f}%)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
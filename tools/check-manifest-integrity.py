@@ -11,11 +11,14 @@
 # >   6. Optionally verifying that SHELLY_MJS.md is in sync with the manifest
 # >   7. Optionally checking standardized headers in script files
 # >   8. Optionally checking 2-space indentation in script files
+# >   9. Optionally emitting a JSON report and per-phase/per-file timings
 
 # How to run it?
 # > Run from anywhere (uses default paths):
 # > python tools/check-manifest-integrity.py
 # > Full CI check: python tools/check-manifest-integrity.py --check-headers --check-indent --check-index --check-sync
+# > Machine-readable output for CI dashboards: add --report json (printed to stdout)
+# > Timing breakdown in the text output: add --profile
 # > Exit code 0 = all checks passed, exit code 1 = errors found
 
 # Standard header format:
@@ -31,6 +34,8 @@ import os
 import json
 import sys
 import re
+import time
+from contextlib import contextmanager
 
 # Default paths (relative to this script's location)
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -169,6 +174,63 @@ def check_indentation(content):
     return len(issues) == 0, issues
 
 
+class Profiler:
+    """Collect cumulative time per check phase and per file."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.files = {}
+
+    @contextmanager
+    def phase(self, name, fname=None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            entry = self.phases.setdefault(name, {"seconds": 0.0, "calls": 0})
+            entry["seconds"] += elapsed
+            entry["calls"] += 1
+            if fname is not None:
+                per_file = self.files.setdefault(fname, {})
+                per_file[name] = per_file.get(name, 0.0) + elapsed
+
+    def total(self):
+        return time.perf_counter() - self.start
+
+    def slowest_files(self, count):
+        totals = [(sum(checks.values()), fname) for fname, checks in self.files.items()]
+        return sorted(totals, reverse=True)[:count]
+
+
+def json_report(args, base_dir, total_entries, errors, warnings, profiler):
+    """Return the --report json document; the caller fills in "checks"."""
+    return {
+        "manifest": args.file,
+        "base_dir": base_dir,
+        "total_entries": total_entries,
+        "passed": not errors,
+        "errors": errors,
+        "warnings": warnings,
+        "checks": {},
+        "durations": {
+            "total_seconds": profiler.total(),
+            "phases": profiler.phases,
+            "files": profiler.files,
+        },
+    }
+
+
+def fatal_error(args, base_dir, message, profiler):
+    """Report an error that stops all checks, in the selected report format."""
+    if args.report == "json":
+        print(json.dumps(json_report(args, base_dir, None, [message], [], profiler), indent=2))
+    else:
+        print(f"ERROR: {message}")
+    return 1
+
+
 def main():
     argparser = ArgumentParser(description="Check integrity of examples-manifest.json (CI/CD)")
     argparser.add_argument(
@@ -187,31 +249,36 @@ def main():
     argparser.add_argument("--check-headers", action="store_true", help="Check scripts for standard headers")
     argparser.add_argument("--check-indent", action="store_true", help="Check scripts for 2-space indentation")
     argparser.add_argument("--check-sync", action="store_true", help="Check that all .shelly.js files are in the manifest")
+    argparser.add_argument(
+        "--report",
+        choices=("text", "json"),
+        default="text",
+        help="Output format; json includes errors, warnings and timings (default: text)"
+    )
+    argparser.add_argument("--profile", action="store_true", help="Print cumulative time per check phase and the slowest files")
 
     args = argparser.parse_args()
-
-    if not os.path.isfile(args.file):
-        print(f"ERROR: Cannot find the file: {args.file}")
-        return 1
+    profiler = Profiler()
 
     if args.base_dir:
         base_dir = os.path.abspath(args.base_dir)
     else:
         base_dir = os.path.dirname(os.path.abspath(args.file))
 
+    if not os.path.isfile(args.file):
+        return fatal_error(args, base_dir, f"Cannot find the file: {args.file}", profiler)
+
     try:
-        with open(args.file, mode="r", encoding="utf-8") as file:
-            json_data = json.loads(file.read())
+        with profiler.phase("manifest load"):
+            with open(args.file, mode="r", encoding="utf-8") as file:
+                json_data = json.loads(file.read())
     except json.JSONDecodeError as e:
-        print(f"ERROR: Invalid JSON in manifest file: {e}")
-        return 1
+        return fatal_error(args, base_dir, f"Invalid JSON in manifest file: {e}", profiler)
     except Exception as e:
-        print(f"ERROR: Failed to read manifest file: {e}")
-        return 1
+        return fatal_error(args, base_dir, f"Failed to read manifest file: {e}", profiler)
 
     if not isinstance(json_data, list):
-        print("ERROR: Manifest must be a JSON array")
-        return 1
+        return fatal_error(args, base_dir, "Manifest must be a JSON array", profiler)
 
     errors = []
     warnings = []
@@ -233,7 +300,9 @@ def main():
             continue
 
         script_path = os.path.join(base_dir, fname)
-        if not os.path.isfile(script_path):
+        with profiler.phase("file exists", fname):
+            exists = os.path.isfile(script_path)
+        if not exists:
             errors.append(f"{entry_id}: Script file not found: {fname}")
             continue
 
@@ -252,48 +321,52 @@ def main():
                 if not os.path.isfile(doc_path):
                     warnings.append(f"{entry_id}: Doc file not found: {doc}")
 
-        # Header checking
-        if args.check_headers:
+        # Both content checks share a single read of the file
+        content = None
+        if args.check_headers or args.check_indent:
             try:
-                with open(script_path, "r", encoding="utf-8") as f:
-                    content = f.read()
+                with profiler.phase("read", fname):
+                    with open(script_path, "r", encoding="utf-8") as f:
+                        content = f.read()
+            except Exception as e:
+                errors.append(f"{entry_id}: Failed to read file for content checks: {e}")
+
+        # Header checking
+        if args.check_headers and content is not None:
+            with profiler.phase("header regex", fname):
                 has_std_header, _, _, status, link = check_header(content)
 
-                if has_std_header:
-                    header_results["has_header"].append(fname)
+            if has_std_header:
+                header_results["has_header"].append(fname)
 
-                    if status is None:
-                        errors.append(f"{entry_id}: Missing @status tag in header")
-                    elif status not in VALID_STATUSES:
-                        errors.append(f"{entry_id}: Invalid @status '{status}' (expected: {', '.join(VALID_STATUSES)})")
+                if status is None:
+                    errors.append(f"{entry_id}: Missing @status tag in header")
+                elif status not in VALID_STATUSES:
+                    errors.append(f"{entry_id}: Invalid @status '{status}' (expected: {', '.join(VALID_STATUSES)})")
 
-                    if link is None:
-                        errors.append(f"{entry_id}: Missing @link tag in header")
-                else:
-                    header_results["missing_header"].append(fname)
-                    errors.append(f"{entry_id}: Missing standard JSDoc header")
-            except Exception as e:
-                errors.append(f"{entry_id}: Failed to read file for header check: {e}")
+                if link is None:
+                    errors.append(f"{entry_id}: Missing @link tag in header")
+            else:
+                header_results["missing_header"].append(fname)
+                errors.append(f"{entry_id}: Missing standard JSDoc header")
 
         # Indentation checking
-        if args.check_indent:
-            try:
-                with open(script_path, "r", encoding="utf-8") as f:
-                    content = f.read()
+        if args.check_indent and content is not None:
+            with profiler.phase("indentation", fname):
                 is_valid, issues = check_indentation(content)
 
-                if is_valid:
-                    indent_results["valid"].append(fname)
-                else:
-                    indent_results["invalid"].append((fname, issues))
-                    errors.append(f"{entry_id}: Invalid indentation ({len(issues)} issues)")
-            except Exception as e:
-                errors.append(f"{entry_id}: Failed to read file for indent check: {e}")
+            if is_valid:
+                indent_results["valid"].append(fname)
+            else:
+                indent_results["invalid"].append((fname, issues))
+                errors.append(f"{entry_id}: Invalid indentation ({len(issues)} issues)")
 
     # Check manifest is in sync with production files on disk
+    manifest_fnames = set(entry.get("fname", "") for entry in json_data)
+    production_fnames = set()
     if args.check_sync:
-        manifest_fnames = set(entry.get("fname", "") for entry in json_data)
-        production_fnames = set(find_shelly_scripts(base_dir, production_only=True))
+        with profiler.phase("walk"):
+            production_fnames = set(find_shelly_scripts(base_dir, production_only=True))
 
         missing_from_manifest = production_fnames - manifest_fnames
         if missing_from_manifest:
@@ -303,7 +376,8 @@ def main():
         non_production_in_manifest = manifest_fnames - production_fnames
         if non_production_in_manifest:
             # Check if the file exists but is not production, vs missing entirely
-            all_fnames = set(find_shelly_scripts(base_dir, production_only=False))
+            with profiler.phase("walk"):
+                all_fnames = set(find_shelly_scripts(base_dir, production_only=False))
             for fname in sorted(non_production_in_manifest):
                 if fname in all_fnames:
                     errors.append(f"Non-production file in manifest: {fname}")
@@ -311,20 +385,42 @@ def main():
                     errors.append(f"Manifest entry has no file on disk: {fname}")
 
     # Check SHELLY_MJS.md is in sync
+    index_in_sync = False
     if args.check_index:
         index_path = os.path.join(base_dir, "SHELLY_MJS.md")
         if not os.path.isfile(index_path):
             errors.append("SHELLY_MJS.md not found")
         else:
             try:
-                with open(index_path, mode="r", encoding="utf-8") as f:
-                    actual_content = f.read()
-                expected_content = generate_index_content(json_data)
-                if actual_content != expected_content:
+                with profiler.phase("index compare"):
+                    with open(index_path, mode="r", encoding="utf-8") as f:
+                        actual_content = f.read()
+                    expected_content = generate_index_content(json_data)
+                    index_in_sync = actual_content == expected_content
+                if not index_in_sync:
                     errors.append("SHELLY_MJS.md is out of sync with manifest")
             except Exception as e:
                 errors.append(f"Failed to read SHELLY_MJS.md: {e}")
 
+    if args.report == "json":
+        report = json_report(args, base_dir, len(json_data), errors, warnings, profiler)
+        if args.check_headers:
+            report["checks"]["headers"] = {
+                "has_header": len(header_results["has_header"]),
+                "missing_header": sorted(header_results["missing_header"]),
+            }
+        if args.check_indent:
+            report["checks"]["indent"] = {
+                "valid": len(indent_results["valid"]),
+                "invalid": {fname: issues for fname, issues in sorted(indent_results["invalid"])},
+            }
+        if args.check_sync:
+            report["checks"]["sync"] = {"in_sync": manifest_fnames == production_fnames}
+        if args.check_index:
+            report["checks"]["index"] = {"in_sync": index_in_sync}
+        print(json.dumps(report, indent=2))
+        return 1 if errors else 0
+
     # Print results
     print(f"\nManifest Integrity Check: {args.file}")
     print("=" * 60)
@@ -350,13 +446,21 @@ def main():
 
     # Sync results
     if args.check_sync:
-        manifest_fnames = set(entry.get("fname", "") for entry in json_data)
-        production_fnames = set(find_shelly_scripts(base_dir, production_only=True))
         if manifest_fnames == production_fnames:
             print(f"\nSync Check: All production files accounted for")
         else:
             print(f"\nSync Check: MISMATCH detected")
 
+    if args.profile:
+        print(f"\nProfile (total {profiler.total() * 1000:.1f} ms):")
+        for name, entry in sorted(profiler.phases.items(), key=lambda x: -x[1]["seconds"]):
+            print(f"  {name:<16} {entry['seconds'] * 1000:9.1f} ms  ({entry['calls']} calls)")
+        slowest = profiler.slowest_files(10)
+        if slowest:
+            print("  Slowest files:")
+            for seconds, fname in slowest:
+                print(f"    {seconds * 1000:7.2f} ms  {fname}")
+
     if errors:
         print(f"\nERRORS ({len(errors)}):")
         for error in errors:
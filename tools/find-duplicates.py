@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# What it does?
+# > This script finds groups of near-duplicate .shelly.js files (copies whose
+# > fixes tend to drift apart) without diffing every pair of files:
+# >   1. Tokenizes each script (comments dropped, string contents normalized)
+# >      and hashes overlapping token shingles
+# >   2. Computes a MinHash signature per file, estimating Jaccard similarity
+# >   3. Buckets signatures with LSH banding; only files sharing a bucket are
+# >      compared, so the cost grows linearly with the number of files
+# >   4. Caches signatures keyed by file content hash, so repeat runs only
+# >      re-hash new or changed files
+
+# How to run it?
+# > Run from anywhere (uses default paths):
+# > python tools/find-duplicates.py
+# > python tools/find-duplicates.py --threshold 0.7 --json
+# > python tools/find-duplicates.py --no-cache
+
+from argparse import ArgumentParser
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import zlib
+
+# Default paths (relative to this script's location)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_REPO_ROOT = os.path.dirname(SCRIPT_DIR)
+DEFAULT_CACHE = os.path.join(DEFAULT_REPO_ROOT, ".minhash-cache.json")
+
+# Directories to exclude from scanning
+EXCLUDE_DIRS = {"node_modules", ".git", "tools", "_backup"}
+
+# MinHash parameters; changing any of them invalidates the cache
+NUM_PERM = 128
+SHINGLE_SIZE = 5
+SEED = 1
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+TOKEN_PATTERN = re.compile(
+    r'//[^\n]*|/\*.*?\*/'
+    r'|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|`(?:[^`\\]|\\.)*`'
+    r'|[A-Za-z_$][\w$]*|\d[\w.]*|[^\s\w]',
+    re.DOTALL
+)
+
+
+def find_shelly_scripts(repo_root):
+    """Find all .shelly.js files in the repository."""
+    scripts = []
+    for root, dirs, files in os.walk(repo_root):
+        dirs[:] = [d for d in dirs if d not in EXCLUDE_DIRS]
+        for file in files:
+            if file.endswith(".shelly.js"):
+                full_path = os.path.join(root, file)
+                rel_path = os.path.relpath(full_path, repo_root)
+                rel_path = rel_path.replace("\\", "/")
+                scripts.append(rel_path)
+    return sorted(scripts)
+
+
+def tokenize(content):
+    """Return code tokens; comments are dropped and strings become a placeholder."""
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(content):
+        token = match.group(0)
+        if token.startswith("//") or token.startswith("/*"):
+            continue
+        if token[0] in "\"'`":
+            token = '"'
+        tokens.append(token)
+    return tokens
+
+
+def shingles(tokens):
+    """Return the set of 32-bit hashes of overlapping token n-grams."""
+    if len(tokens) < SHINGLE_SIZE:
+        return {zlib.crc32(" ".join(tokens).encode("utf-8"))} if tokens else set()
+    return {
+        zlib.crc32(" ".join(tokens[i:i + SHINGLE_SIZE]).encode("utf-8"))
+        for i in range(len(tokens) - SHINGLE_SIZE + 1)
+    }
+
+
+def permutations():
+    """Return the (a, b) coefficients of the NUM_PERM hash permutations."""
+    rng = random.Random(SEED)
+    return [(rng.randint(1, MERSENNE_PRIME - 1), rng.randint(0, MERSENNE_PRIME - 1)) for _ in range(NUM_PERM)]
+
+
+def minhash(values, perms):
+    """Return the MinHash signature of a set of 32-bit values."""
+    if not values:
+        return [MAX_HASH] * NUM_PERM
+    return [min(((a * x + b) % MERSENNE_PRIME) & MAX_HASH for x in values) for a, b in perms]
+
+
+def similarity(sig_a, sig_b):
+    """Estimate the Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def load_cache(path):
+    """Load cached signatures if they were built with the current parameters.
+
+    Signatures are kept per scanned tree (absolute --base-dir), so runs over
+    different trees share one cache file without evicting each other.
+    """
+    params = {"num_perm": NUM_PERM, "shingle_size": SHINGLE_SIZE, "seed": SEED, "layout": "trees"}
+    if path and os.path.isfile(path):
+        try:
+            with open(path, mode="r", encoding="utf-8") as f:
+                cache = json.load(f)
+            if cache.get("params") == params:
+                return cache
+        except (ValueError, OSError):
+            pass
+    return {"params": params, "trees": {}}
+
+
+def save_cache(path, cache):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, mode="w", encoding="utf-8") as f:
+        json.dump(cache, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def build_index(repo_root, cache):
+    """Update cached signatures for all scripts. Returns (signatures, rehashed count)."""
+    perms = None
+    entries = {}
+    rehashed = 0
+    cached_files = cache["trees"].get(repo_root, {})
+    for fname in find_shelly_scripts(repo_root):
+        with open(os.path.join(repo_root, fname), mode="rb") as f:
+            data = f.read()
+        digest = hashlib.sha1(data).hexdigest()
+        cached = cached_files.get(fname)
+        if cached and cached["sha1"] == digest:
+            entries[fname] = cached
+            continue
+        if perms is None:
+            perms = permutations()
+        tokens = tokenize(data.decode("utf-8", errors="replace"))
+        entries[fname] = {"sha1": digest, "sig": minhash(shingles(tokens), perms)}
+        rehashed += 1
+    # Files that disappeared from this tree are dropped from the cache here
+    cache["trees"][repo_root] = entries
+    return {fname: entry["sig"] for fname, entry in entries.items()}, rehashed
+
+
+def choose_bands(threshold):
+    """Pick the LSH band count for a target similarity threshold.
+
+    Uses the banding whose own threshold, (1/bands)^(1/rows), is the highest one
+    not above the target: pairs at the target similarity then almost always
+    share a bucket, while unrelated files rarely do.
+    """
+    options = []
+    for bands in range(1, NUM_PERM + 1):
+        if NUM_PERM % bands == 0:
+            rows = NUM_PERM // bands
+            options.append(((1.0 / bands) ** (1.0 / rows), bands))
+    below = [o for o in options if o[0] <= threshold]
+    return max(below)[1] if below else min(options)[1]
+
+
+def find_groups(signatures, threshold, bands):
+    """Return groups of files whose estimated similarity reaches the threshold."""
+    rows = NUM_PERM // bands
+    candidates = set()
+    for band in range(bands):
+        buckets = {}
+        for fname, sig in signatures.items():
+            key = tuple(sig[band * rows:(band + 1) * rows])
+            buckets.setdefault(key, []).append(fname)
+        for members in buckets.values():
+            for i in range(len(members)):
+                for j in range(i + 1, len(members)):
+                    candidates.add((members[i], members[j]))
+
+    parent = {}
+
+    def find(x):
+        while parent.get(x, x) != x:
+            parent[x] = parent.get(parent[x], parent[x])
+            x = parent[x]
+        return x
+
+    pairs = {}
+    for a, b in candidates:
+        score = similarity(signatures[a], signatures[b])
+        if score >= threshold:
+            pairs[(a, b)] = score
+            parent[find(a)] = find(b)
+
+    groups = {}
+    for a, b in pairs:
+        for fname in (a, b):
+            groups.setdefault(find(fname), set()).add(fname)
+
+    result = []
+    for members in groups.values():
+        members = sorted(members)
+        scores = [s for (a, b), s in pairs.items() if a in members]
+        result.append({"files": members, "max_similarity": max(scores), "min_similarity": min(scores)})
+    result.sort(key=lambda g: (-len(g["files"]), -g["max_similarity"], g["files"][0]))
+    return result, len(candidates)
+
+
+def main():
+    argparser = ArgumentParser(description="Find groups of near-duplicate .shelly.js files (MinHash/LSH)")
+    argparser.add_argument(
+        "--base-dir",
+        default=DEFAULT_REPO_ROOT,
+        help=f"Repository directory to scan (default: {DEFAULT_REPO_ROOT})"
+    )
+    argparser.add_argument("--threshold", type=float, default=0.6, help="Minimum estimated Jaccard similarity (default: 0.6)")
+    argparser.add_argument("--bands", type=int, default=None, help=f"LSH bands, must divide {NUM_PERM} (default: derived from --threshold)")
+    argparser.add_argument("--cache", default=DEFAULT_CACHE, help=f"Signature cache file (default: {DEFAULT_CACHE})")
+    argparser.add_argument("--no-cache", action="store_true", help="Ignore and do not write the signature cache")
+    argparser.add_argument("--json", action="store_true", help="Print the groups as JSON")
+
+    args = argparser.parse_args()
+
+    if not 0 < args.threshold <= 1:
+        print(f"ERROR: --threshold must be in (0, 1]: {args.threshold}")
+        return 1
+    bands = args.bands or choose_bands(args.threshold)
+    if bands < 1 or NUM_PERM % bands:
+        print(f"ERROR: --bands must divide {NUM_PERM}: {bands}")
+        return 1
+
+    base_dir = os.path.abspath(args.base_dir)
+    cache = load_cache(None if args.no_cache else args.cache)
+    signatures, rehashed = build_index(base_dir, cache)
+    if not args.no_cache:
+        save_cache(args.cache, cache)
+
+    groups, candidates = find_groups(signatures, args.threshold, bands)
+
+    if args.json:
+        print(json.dumps(groups, indent=2))
+        return 0
+
+    print(f"\nNear-Duplicate Scripts: {base_dir}")
+    print("=" * 60)
+    print(f"Scripts indexed: {len(signatures)} ({rehashed} re-hashed, {len(signatures) - rehashed} from cache)")
+    print(f"LSH: {bands} bands x {NUM_PERM // bands} rows, {candidates} candidate pair(s)")
+    print(f"Groups at similarity >= {args.threshold:.2f}: {len(groups)}")
+    for group in groups:
+        print(f"\n  [{len(group['files'])} files, similarity {group['min_similarity']:.2f}-{group['max_similarity']:.2f}]")
+        for fname in group["files"]:
+            print(f"    {fname}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
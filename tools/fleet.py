@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+# What it does?
+# > Shared helpers for the fleet tools (backup_scripts.py, rollout_script.py,
+# > push_config.py); it is imported by them and not run on its own:
+# >   - call_rpc() raises RpcError instead of exiting, so one device cannot
+# >     stop a run over many devices
+# >   - read_inventory() reads the "<host> [label]" inventory file
+# >   - get_code_chunk() / read_code() do ranged Script.GetCode reads, whose
+# >     offset, len and left count bytes rather than characters
+
+import json
+import re
+import urllib.request
+import urllib.error
+
+CHUNK_SIZE = 1024
+
+
+class RpcError(Exception):
+    pass
+
+
+def call_rpc(host, method, params, timeout=5):
+    """Call a Shelly RPC method and return the result."""
+    url = f"http://{host}/rpc/{method}"
+    req_data = json.dumps(params, ensure_ascii=False).encode("utf-8")
+    request = urllib.request.Request(
+        url,
+        data=req_data,
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            # surrogateescape keeps a partial multi-byte character (as at the
+            # end of a ranged Script.GetCode read) recoverable as raw bytes
+            result = json.loads(response.read().decode("utf-8", errors="surrogateescape"))
+    except urllib.error.HTTPError as e:
+        body = e.read().decode("utf-8", errors="replace")
+        raise RpcError(f"HTTP error {e.code} calling {method}: {body}")
+    except urllib.error.URLError as e:
+        raise RpcError(f"Connection error calling {method}: {e.reason}")
+    except (OSError, ValueError) as e:
+        raise RpcError(f"Error calling {method}: {e}")
+
+    if isinstance(result, dict) and result.get("code", 0) < 0:
+        raise RpcError(f"RPC error [{result['code']}] calling {method}: {result.get('message', 'unknown')}")
+
+    return result
+
+
+def read_inventory(path):
+    """Read "<host> [label]" lines, skipping blanks and # comments.
+
+    Labels are reduced to file name safe characters, as tools use them for
+    per-device files.
+    """
+    devices = []
+    with open(path, mode="r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            parts = line.split(None, 1)
+            host = parts[0]
+            label = parts[1].strip() if len(parts) > 1 else host
+            devices.append({"host": host, "label": re.sub(r"[^\w.-]", "_", label)})
+    return devices
+
+
+def duplicate_labels(devices):
+    """Return the labels shared by more than one device, sorted."""
+    labels = [d["label"] for d in devices]
+    return sorted(set(label for label in labels if labels.count(label) > 1))
+
+
+def get_code_chunk(host, script_id, offset, length):
+    """Ranged Script.GetCode read. Returns (raw bytes, bytes left after it).
+
+    A chunk may end inside a multi-byte character, so chunks are joined as
+    bytes and only decoded (decode_code) once complete.
+    """
+    result = call_rpc(host, "Script.GetCode", {"id": script_id, "offset": offset, "len": length})
+    return result.get("data", "").encode("utf-8", errors="surrogateescape"), result.get("left", 0)
+
+
+def decode_code(script_id, data):
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        raise RpcError(f"Script {script_id}: code is not valid UTF-8 ({e})")
+
+
+def read_code(host, script_id, chunk_size=CHUNK_SIZE, on_chunk=None):
+    """Read the complete code of a script slot.
+
+    on_chunk is called with the byte size of every chunk read, e.g. to
+    charge it to a bandwidth limiter.
+    """
+    parts = []
+    offset = 0
+    left = 1
+    while left > 0:
+        data, left = get_code_chunk(host, script_id, offset, chunk_size)
+        if not data and left > 0:
+            raise RpcError(f"Script {script_id}: empty read at offset {offset} with {left} bytes left")
+        if on_chunk:
+            on_chunk(len(data))
+        parts.append(data)
+        offset += len(data)
+    return decode_code(script_id, b"".join(parts))
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# What it does?
+# > This script turns a MODBUS register map into a compact packed table for
+# > The Pill drivers, instead of the verbose ENTITIES array of objects:
+# >   1. Reads the register map from a JSON description, or extracts the
+# >      ENTITIES array straight from an existing driver (.shelly.js)
+# >   2. Emits parallel arrays (names, addresses) plus one encoded string that
+# >      holds the remaining per-register fields as table indices
+# >   3. Emits a tiny entAt(i) decoder (named after --prefix) that returns the
+# >      same shape as an ENTITIES item, so drivers only build an object for the
+# >      register at hand
+# >   4. Reports source size and runtime object/property counts, verbose vs packed
+
+# How to run it?
+# > python tools/pack-modbus-registers.py the_pill/MODBUS/Deye/deye.shelly.js
+# > python tools/pack-modbus-registers.py registers.json -o packed.js --prefix DEYE
+# > Dump the map of an existing driver as an editable JSON description:
+# > python tools/pack-modbus-registers.py the_pill/MODBUS/Deye/deye.shelly.js --dump-json > deye.json
+
+# Register map description (JSON array, one object per register):
+# [
+#   { "key": "TOTAL_POWER", "name": "Total Power", "units": "W",
+#     "addr": 175, "rtype": 3, "itype": "i16", "bo": "BE", "wo": "BE",
+#     "scale": 1, "rights": "R", "vcId": null }
+# ]
+# > Only name, addr and itype are required; key (a unique JavaScript
+# > identifier) and vcId are optional; the rest default to units "-",
+# > rtype 3, bo/wo "BE", scale 1, rights "R".
+# > The nested ENTITIES form ({ name, reg: { addr, ... }, ... }) is accepted too.
+# > Any other field (e.g. "offset") is an error; --allow-unknown drops it with
+# > a warning instead.
+
+from argparse import ArgumentParser
+import json
+import os
+import re
+import sys
+
+DEFAULTS = {"units": "-", "rtype": 3, "bo": "BE", "wo": "BE", "scale": 1, "rights": "R"}
+REG_FIELDS = ("addr", "rtype", "itype", "bo", "wo")
+ENTRY_FIELDS = ("key", "name", "units", "reg", "scale", "rights", "vcId") + REG_FIELDS
+
+# Keys become bare property names of the <PREFIX> key -> index map
+KEY_PATTERN = re.compile(r'^[A-Za-z_$][\w$]*$')
+
+# Filled in by drivers at runtime, safe to drop from the packed table
+RUNTIME_FIELDS = ("handle", "vcHandle")
+
+# Table-indexed fields in the order they are encoded, one character each
+TABLE_FIELDS = ("itype", "bo", "wo", "rights", "units", "scale")
+
+# Encoded characters start at '0' and stay printable ASCII
+INDEX_BASE = 48
+INDEX_MAX = 126 - INDEX_BASE
+
+
+class ParseError(Exception):
+    pass
+
+
+class JsLiteralParser:
+    """Parse a JavaScript array/object literal into Python values.
+
+    Supports what register maps use: objects with bare or quoted keys,
+    arrays, single/double quoted strings, decimal/hex numbers, null,
+    true/false, comments and trailing commas.
+    """
+
+    TOKEN = re.compile(
+        r'\s+|//[^\n]*|/\*.*?\*/'
+        r'|(?P<num>-?(?:0[xX][0-9a-fA-F]+|\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+))'
+        r'|(?P<str>"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')'
+        r'|(?P<ident>[A-Za-z_$][\w$]*)'
+        r'|(?P<punct>[\[\]{}:,])',
+        re.DOTALL
+    )
+
+    def __init__(self, text):
+        self.tokens = []
+        pos = 0
+        while pos < len(text):
+            match = self.TOKEN.match(text, pos)
+            if not match:
+                raise ParseError(f"Unexpected character {text[pos]!r} at offset {pos}")
+            pos = match.end()
+            if match.lastgroup:
+                self.tokens.append((match.lastgroup, match.group(match.lastgroup)))
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        token = self.peek()
+        if token[0] is None or (value is not None and token[1] != value):
+            raise ParseError(f"Expected {value or 'a value'}, got {token[1]!r}")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        kind, value = self.take()
+        if value == "[":
+            items = []
+            while self.peek()[1] != "]":
+                items.append(self.parse())
+                if self.peek()[1] == ",":
+                    self.take(",")
+            self.take("]")
+            return items
+        if value == "{":
+            obj = {}
+            while self.peek()[1] != "}":
+                key_kind, key = self.take()
+                if key_kind == "str":
+                    key = self.unquote(key)
+                self.take(":")
+                obj[key] = self.parse()
+                if self.peek()[1] == ",":
+                    self.take(",")
+            self.take("}")
+            return obj
+        if kind == "num":
+            if value.lstrip("-").lower().startswith("0x"):
+                return int(value, 16)
+            number = float(value)
+            return int(number) if number.is_integer() and "." not in value and "e" not in value.lower() else number
+        if kind == "str":
+            return self.unquote(value)
+        if kind == "ident" and value in ("null", "true", "false"):
+            return {"null": None, "true": True, "false": False}[value]
+        raise ParseError(f"Unsupported value {value!r}")
+
+    @staticmethod
+    def unquote(value):
+        if value.startswith("'"):
+            value = '"' + value[1:-1].replace('\\\'', "'").replace('"', '\\"') + '"'
+        return json.loads(value)
+
+
+def extract_array(text, var_name):
+    """Return the source of the array literal assigned to var_name."""
+    match = re.search(r'\b(?:var|let|const)\s+' + re.escape(var_name) + r'\s*=\s*\[', text)
+    if not match:
+        return None
+    start = match.end() - 1
+    depth = 0
+    i = start
+    quote = None
+    while i < len(text):
+        c = text[i]
+        if quote:
+            if c == "\\":
+                i += 1
+            elif c == quote:
+                quote = None
+        elif text.startswith("//", i):
+            i = text.find("\n", i)
+            if i < 0:
+                break
+        elif text.startswith("/*", i):
+            i = text.find("*/", i) + 1
+        elif c in "\"'":
+            quote = c
+        elif c == "[":
+            depth += 1
+        elif c == "]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+        i += 1
+    return None
+
+
+def normalize(entries, allow_unknown=False):
+    """Flatten ENTITIES-style entries into register descriptions.
+
+    Fields the packed table cannot represent are an error, or with
+    allow_unknown a warning. Returns (registers, warnings).
+    """
+    registers = []
+    warnings = []
+    keys = set()
+    for idx, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ParseError(f"Entry {idx + 1}: expected an object")
+        unknown = [k for k in entry if k not in ENTRY_FIELDS and k not in RUNTIME_FIELDS]
+        unknown += [f"reg.{k}" for k in (entry.get("reg") or {}) if k not in REG_FIELDS]
+        if unknown:
+            message = f"Entry {idx + 1} ({entry.get('name', '?')}): unsupported field(s) {', '.join(unknown)}"
+            if not allow_unknown:
+                raise ParseError(message)
+            warnings.append(message + " dropped")
+        reg = dict(entry.get("reg") or {})
+        for field in REG_FIELDS:
+            if field in entry:
+                reg[field] = entry[field]
+        item = {
+            "key": entry.get("key"),
+            "name": entry.get("name"),
+            "units": entry.get("units", DEFAULTS["units"]),
+            "addr": reg.get("addr"),
+            "rtype": reg.get("rtype", DEFAULTS["rtype"]),
+            "itype": reg.get("itype"),
+            "bo": reg.get("bo", DEFAULTS["bo"]),
+            "wo": reg.get("wo", DEFAULTS["wo"]),
+            "scale": entry.get("scale", DEFAULTS["scale"]),
+            "rights": entry.get("rights", DEFAULTS["rights"]),
+            "vcId": entry.get("vcId"),
+        }
+        for field in ("name", "addr", "itype"):
+            if item[field] is None:
+                raise ParseError(f"Entry {idx + 1}: missing '{field}'")
+        if not isinstance(item["addr"], int) or not 0 <= item["addr"] <= 0xFFFF:
+            raise ParseError(f"Entry {idx + 1}: invalid register address {item['addr']!r}")
+        if item["rtype"] not in (1, 2, 3, 4):
+            raise ParseError(f"Entry {idx + 1}: invalid rtype {item['rtype']!r} (expected 0x01-0x04)")
+        if item["key"] is not None:
+            if not isinstance(item["key"], str) or not KEY_PATTERN.match(item["key"]):
+                raise ParseError(f"Entry {idx + 1}: invalid key {item['key']!r} (expected a JavaScript identifier)")
+            if item["key"] in keys:
+                raise ParseError(f"Entry {idx + 1}: duplicate key {item['key']!r}")
+            keys.add(item["key"])
+        registers.append(item)
+    return registers, warnings
+
+
+def js_value(value):
+    """Render a Python value as a JavaScript literal."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return json.dumps(value, ensure_ascii=False)
+
+
+def js_list(values):
+    return "[" + ", ".join(js_value(v) for v in values) + "]"
+
+
+def build_tables(registers):
+    """Collect the distinct values of every table-indexed field."""
+    tables = {}
+    for field in TABLE_FIELDS:
+        values = []
+        for reg in registers:
+            if reg[field] not in values:
+                values.append(reg[field])
+        if len(values) > INDEX_MAX:
+            raise ParseError(f"Too many distinct '{field}' values ({len(values)}, max {INDEX_MAX})")
+        tables[field] = values
+    return tables
+
+
+def render_packed(registers, prefix):
+    """Render the packed register table and its decoder."""
+    tables = build_tables(registers)
+    width = 1 + len(TABLE_FIELDS)
+    meta = []
+    for reg in registers:
+        meta.append(chr(INDEX_BASE + reg["rtype"]))
+        for field in TABLE_FIELDS:
+            meta.append(chr(INDEX_BASE + tables[field].index(reg[field])))
+    has_keys = any(reg["key"] for reg in registers)
+    has_vc = any(reg["vcId"] is not None for reg in registers)
+
+    lines = [
+        f"/* === {prefix} REGISTER MAP (packed by tools/pack-modbus-registers.py) ===",
+        " *",
+        f" * {len(registers)} registers. {prefix}_META holds {width} characters per register:",
+        " * rtype, then indices (char code - 48) into the itype, bo, wo, rights,",
+        " * units and scale tables. Use " + f"{prefix.lower()}At(i)" + " to get an ENTITIES-style object.",
+        " */",
+        f"var {prefix}_COUNT = {len(registers)};",
+        f"var {prefix}_NAMES = {js_list([r['name'] for r in registers])};",
+        f"var {prefix}_ADDR = {js_list([r['addr'] for r in registers])};",
+        f"var {prefix}_META = {json.dumps(''.join(meta))};",
+    ]
+    for field in TABLE_FIELDS:
+        lines.append(f"var {prefix}_{field.upper()} = {js_list(tables[field])};")
+    if has_vc:
+        lines.append(f"var {prefix}_VCID = {js_list([r['vcId'] for r in registers])};")
+    if has_keys:
+        pairs = ", ".join(f"{r['key']}: {i}" for i, r in enumerate(registers) if r["key"])
+        lines.append(f"var {prefix} = {{ {pairs} }};")
+
+    fn = f"{prefix.lower()}At"
+    lines += [
+        "",
+        f"function {fn}(i) {{",
+        f"  var m = i * {width};",
+        f"  var s = {prefix}_META;",
+        "  return {",
+        f"    name:   {prefix}_NAMES[i],",
+        f"    units:  {prefix}_UNITS[s.charCodeAt(m + 5) - {INDEX_BASE}],",
+        "    reg:    {",
+        f"      addr:  {prefix}_ADDR[i],",
+        f"      rtype: s.charCodeAt(m) - {INDEX_BASE},",
+        f"      itype: {prefix}_ITYPE[s.charCodeAt(m + 1) - {INDEX_BASE}],",
+        f"      bo:    {prefix}_BO[s.charCodeAt(m + 2) - {INDEX_BASE}],",
+        f"      wo:    {prefix}_WO[s.charCodeAt(m + 3) - {INDEX_BASE}]",
+        "    },",
+        f"    scale:  {prefix}_SCALE[s.charCodeAt(m + 6) - {INDEX_BASE}],",
+        f"    rights: {prefix}_RIGHTS[s.charCodeAt(m + 4) - {INDEX_BASE}],",
+        f"    vcId:   {prefix + '_VCID[i]' if has_vc else 'null'}",
+        "  };",
+        "}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def render_verbose(registers):
+    """Render the register map in the one-line-per-entry ENTITIES form."""
+    lines = ["var ENTITIES = ["]
+    for reg in registers:
+        key = f"key: {js_value(reg['key'])}, " if reg["key"] else ""
+        lines.append(
+            f"  {{ {key}name: {js_value(reg['name'])}, units: {js_value(reg['units'])}, "
+            f"reg: {{ addr: {reg['addr']}, rtype: 0x{reg['rtype']:02X}, itype: {js_value(reg['itype'])}, "
+            f"bo: {js_value(reg['bo'])}, wo: {js_value(reg['wo'])} }}, scale: {js_value(reg['scale'])}, "
+            f"rights: {js_value(reg['rights'])}, vcId: {js_value(reg['vcId'])}, handle: null, vcHandle: null }},"
+        )
+    lines.append("];")
+    return "\n".join(lines) + "\n"
+
+
+def runtime_counts(registers):
+    """Estimate the values the script keeps alive: (objects, properties/elements)."""
+    n = len(registers)
+    verbose = (1 + 2 * n, n + n * (9 + len(REG_FIELDS)))
+    tables = build_tables(registers)
+    arrays = 2 + len(TABLE_FIELDS)
+    elements = 2 * n + sum(len(v) for v in tables.values())
+    if any(reg["vcId"] is not None for reg in registers):
+        arrays += 1
+        elements += n
+    if any(reg["key"] for reg in registers):
+        arrays += 1
+        elements += sum(1 for reg in registers if reg["key"])
+    # The META string is a single value regardless of the register count
+    packed = (arrays, elements + 1)
+    return verbose, packed
+
+
+def main():
+    argparser = ArgumentParser(description="Generate a compact packed MODBUS register table for The Pill drivers")
+    argparser.add_argument("file", help="Register map (.json) or driver script (.js) containing the ENTITIES array")
+    argparser.add_argument("-o", "--output", default=None, help="Write the packed table to this file (default: stdout)")
+    argparser.add_argument("--prefix", default="ENT", help="Prefix for the generated variables (default: ENT)")
+    argparser.add_argument("--var", default="ENTITIES", help="Array variable to extract from a script (default: ENTITIES)")
+    argparser.add_argument("--dump-json", action="store_true", help="Print the register map as a JSON description and exit")
+    argparser.add_argument("--allow-unknown", action="store_true", help="Drop unsupported fields with a warning instead of failing")
+
+    args = argparser.parse_args()
+
+    if not os.path.isfile(args.file):
+        print(f"ERROR: Cannot find the file: {args.file}", file=sys.stderr)
+        return 1
+
+    if not re.match(r'^[A-Z_][A-Z0-9_]*$', args.prefix):
+        print(f"ERROR: Prefix must be an upper-case identifier: {args.prefix}", file=sys.stderr)
+        return 1
+
+    with open(args.file, mode="r", encoding="utf-8") as f:
+        text = f.read()
+
+    original = None
+    try:
+        if args.file.endswith(".js"):
+            original = extract_array(text, args.var)
+            if original is None:
+                print(f"ERROR: No '{args.var}' array found in {args.file}", file=sys.stderr)
+                return 1
+            entries = JsLiteralParser(original).parse()
+        else:
+            entries = json.loads(text)
+        if not isinstance(entries, list) or not entries:
+            raise ParseError("Register map must be a non-empty array")
+        registers, warnings = normalize(entries, args.allow_unknown)
+        packed = render_packed(registers, args.prefix)
+    except (ParseError, json.JSONDecodeError) as e:
+        print(f"ERROR: Invalid register map: {e}", file=sys.stderr)
+        return 1
+
+    for warning in warnings:
+        print(f"WARNING: {warning}", file=sys.stderr)
+
+    if args.dump_json:
+        print(json.dumps(registers, indent=2, ensure_ascii=False))
+        return 0
+
+    if args.output:
+        with open(args.output, mode="w", encoding="utf-8") as f:
+            f.write(packed)
+    else:
+        sys.stdout.write(packed)
+
+    verbose = render_verbose(registers)
+    (v_obj, v_props), (p_obj, p_props) = runtime_counts(registers)
+    report = sys.stderr if not args.output else sys.stdout
+    print(f"\nRegister table: {args.file} ({len(registers)} registers)", file=report)
+    print("=" * 60, file=report)
+    print("Source size (bytes):", file=report)
+    if original is not None:
+        print(f"  {'Original ' + args.var + ' literal:':31}{len(original.encode('utf-8'))}", file=report)
+    print(f"  {'Verbose ENTITIES (1 line/reg):':31}{len(verbose.encode('utf-8'))}", file=report)
+    print(f"  {'Packed table + decoder:':31}{len(packed.encode('utf-8'))}", file=report)
+    print("Runtime values (objects / properties+elements):", file=report)
+    print(f"  {'Verbose ENTITIES:':31}{v_obj} / {v_props}", file=report)
+    print(f"  {'Packed table:':31}{p_obj} / {p_props}", file=report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# What it does?
+# > This script applies a declarative configuration (KVS keys and virtual
+# > components) to many Shelly devices at once:
+# >   1. Reads an inventory file (one device per line: "<host> [label]")
+# >   2. Reads the current state of every device in parallel
+# >      (KVS.GetMany, Shelly.GetComponents with dynamic_only)
+# >   3. Diffs it against the config file and only writes what differs:
+# >      KVS.Set for changed keys, Virtual.Add for missing components,
+# >      <Type>.SetConfig for changed settings and <Type>.Set for values
+# >      (e.g. Group.Set for group members)
+
+# How to run it?
+# > python tools/push_config.py inventory.txt config.json --dry-run
+# > python tools/push_config.py inventory.txt config.json --workers 32
+# > Exit code 0 = all devices up to date, exit code 1 = at least one device failed
+
+# Config file format:
+# {
+#   "kvs": {
+#     "events-to-kvs.motion": "{\"event\": \"motion\"}",
+#     "poll-interval": 30
+#   },
+#   "components": [
+#     { "key": "number:200", "config": { "name": "Pack Voltage", "unit": "V", "persisted": false } },
+#     { "key": "group:200", "config": { "name": "JK200 BMS" }, "value": ["number:200"] }
+#   ]
+# }
+# > Only the config fields listed are compared, so device defaults are left alone.
+# > Groups are applied after the other components, which must exist first.
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import re
+import sys
+
+from fleet import RpcError, call_rpc, duplicate_labels, read_inventory
+
+# Virtual component types that Virtual.Add accepts
+COMPONENT_TYPES = {"boolean", "number", "text", "enum", "button", "group"}
+
+
+def load_config(path):
+    """Load and validate the config file. Returns (config, errors)."""
+    errors = []
+    with open(path, mode="r", encoding="utf-8") as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        return None, ["Config must be a JSON object"]
+
+    kvs = config.setdefault("kvs", {})
+    if not isinstance(kvs, dict):
+        errors.append("'kvs' must be an object of key/value pairs")
+
+    components = config.setdefault("components", [])
+    if not isinstance(components, list):
+        errors.append("'components' must be an array")
+        components = []
+    seen = set()
+    for idx, comp in enumerate(components):
+        entry_id = f"Component {idx + 1}"
+        key = comp.get("key", "") if isinstance(comp, dict) else ""
+        match = re.match(r"^([a-z]+):(\d+)$", key)
+        if not match or match.group(1) not in COMPONENT_TYPES:
+            errors.append(f"{entry_id}: Invalid 'key' {key!r} (expected <type>:<id>, type one of {', '.join(sorted(COMPONENT_TYPES))})")
+            continue
+        if key in seen:
+            errors.append(f"{entry_id}: Duplicate key {key}")
+        seen.add(key)
+        if not isinstance(comp.get("config", {}), dict):
+            errors.append(f"[{key}]: 'config' must be an object")
+    return config, errors
+
+
+def get_kvs(host):
+    """Return all KVS entries of a device as a dict."""
+    items = {}
+    offset = 0
+    while True:
+        result = call_rpc(host, "KVS.GetMany", {"match": "*", "offset": offset})
+        page = result.get("items", [])
+        # Older firmware returns an object keyed by KVS key, newer an array
+        if isinstance(page, dict):
+            page = [dict(value, key=key) for key, value in page.items()]
+        for item in page:
+            items[item["key"]] = item.get("value")
+        offset += len(page)
+        if not page or offset >= result.get("total", offset):
+            return items
+
+
+def get_components(host):
+    """Return the dynamic (virtual) components of a device keyed by key."""
+    components = {}
+    offset = 0
+    while True:
+        result = call_rpc(host, "Shelly.GetComponents", {"dynamic_only": True, "offset": offset})
+        page = result.get("components", [])
+        for comp in page:
+            components[comp["key"]] = comp
+        offset += len(page)
+        if not page or offset >= result.get("total", offset):
+            return components
+
+
+def is_subset(wanted, current):
+    """True when every field in wanted has the same value in current."""
+    if isinstance(wanted, dict):
+        if not isinstance(current, dict):
+            return False
+        return all(k in current and is_subset(v, current[k]) for k, v in wanted.items())
+    return wanted == current
+
+
+def plan_device(config, kvs, components):
+    """Return the list of (method, params, description) calls a device needs."""
+    calls = []
+    for key, value in config["kvs"].items():
+        if key not in kvs:
+            calls.append(("KVS.Set", {"key": key, "value": value}, f"add KVS {key}"))
+        elif kvs[key] != value:
+            calls.append(("KVS.Set", {"key": key, "value": value}, f"update KVS {key}"))
+
+    # Group members must exist before Group.Set, so groups go last
+    ordered = sorted(config["components"], key=lambda c: c["key"].startswith("group:"))
+    for comp in ordered:
+        key = comp["key"]
+        comp_type, comp_id = key.split(":")
+        comp_id = int(comp_id)
+        method_prefix = comp_type.capitalize()
+        wanted_config = comp.get("config", {})
+        current = components.get(key)
+
+        if current is None:
+            calls.append(("Virtual.Add", {"type": comp_type, "id": comp_id, "config": wanted_config}, f"add {key}"))
+        elif wanted_config and not is_subset(wanted_config, current.get("config", {})):
+            calls.append((f"{method_prefix}.SetConfig", {"id": comp_id, "config": wanted_config}, f"update {key} config"))
+
+        if "value" in comp:
+            current_value = (current or {}).get("status", {}).get("value")
+            if current is None or current_value != comp["value"]:
+                calls.append((f"{method_prefix}.Set", {"id": comp_id, "value": comp["value"]}, f"set {key} value"))
+    return calls
+
+
+def push_device(device, config, dry_run):
+    """Diff and apply the config on one device. Returns the planned calls."""
+    host = device["host"]
+    kvs = get_kvs(host) if config["kvs"] else {}
+    components = get_components(host) if config["components"] else {}
+    calls = plan_device(config, kvs, components)
+    if not dry_run:
+        for method, params, _ in calls:
+            call_rpc(host, method, params)
+    return calls
+
+
+def main():
+    argparser = ArgumentParser(description="Apply KVS keys and virtual components to many Shelly devices")
+    argparser.add_argument("inventory", help="Inventory file, one device per line: <host> [label]")
+    argparser.add_argument("config", help="JSON config file with 'kvs' and 'components'")
+    argparser.add_argument("--workers", type=int, default=16, help="Devices configured in parallel (default: 16)")
+    argparser.add_argument("--dry-run", action="store_true", help="Show what would be written without making changes")
+
+    args = argparser.parse_args()
+
+    for path in (args.inventory, args.config):
+        if not os.path.isfile(path):
+            print(f"ERROR: Cannot find the file: {path}")
+            return 1
+
+    try:
+        config, config_errors = load_config(args.config)
+    except json.JSONDecodeError as e:
+        print(f"ERROR: Invalid JSON in config file: {e}")
+        return 1
+    if config_errors:
+        print(f"\nERRORS ({len(config_errors)}):")
+        for error in config_errors:
+            print(f"  [X] {error}")
+        return 1
+
+    devices = read_inventory(args.inventory)
+    if not devices:
+        print(f"ERROR: No devices in inventory: {args.inventory}")
+        return 1
+
+    duplicates = duplicate_labels(devices)
+    if duplicates:
+        print(f"ERROR: Duplicate device labels in inventory: {', '.join(duplicates)}")
+        return 1
+
+    errors = []
+    writes = 0
+    unchanged = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {pool.submit(push_device, d, config, args.dry_run): d for d in devices}
+        for future, device in futures.items():
+            try:
+                calls = future.result()
+            except RpcError as e:
+                errors.append(f"{device['label']} ({device['host']}): {e}")
+                continue
+            if not calls:
+                unchanged += 1
+                print(f"  [OK] {device['label']}: up to date")
+                continue
+            writes += len(calls)
+            print(f"  [{'DRY' if args.dry_run else 'OK'}] {device['label']}: {len(calls)} change(s)")
+            for _, _, description in calls:
+                print(f"         {description}")
+
+    print(f"\nConfig Push: {args.config}{' (dry run)' if args.dry_run else ''}")
+    print("=" * 60)
+    print(f"Devices: {len(devices)} ({unchanged} up to date, {len(errors)} failed)")
+    print(f"Writes {'planned' if args.dry_run else 'applied'}: {writes}")
+
+    if errors:
+        print(f"\nERRORS ({len(errors)}):")
+        for error in errors:
+            print(f"  [X] {error}")
+        print(f"\n[FAIL] {len(errors)} device(s) failed")
+        return 1
+
+    print("\n[OK] Done")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
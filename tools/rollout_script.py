@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# What it does?
+# > This script deploys one script to many Shelly devices in waves:
+# >   1. Reads an inventory file (one device per line: "<host> [label]")
+# >   2. Splits the devices into waves (e.g. 1 canary, then 10, then 50 at a time)
+# >   3. Uploads within a wave in parallel, limited by a global concurrency and
+# >      bandwidth budget and by a per-subnet concurrency limit
+# >   4. Before uploading, saves the code currently in the slot to a local cache
+# >      (kept as is when re-running a rollout over devices already updated)
+# >   5. After Script.Start, waits and checks Script.GetStatus for running state
+# >      and errors before the device counts as healthy
+# >   6. If a wave's failure rate exceeds the threshold, halts the rollout and
+# >      (by default) restores the cached previous code on that wave's devices,
+# >      health-checking restored scripts that were running before
+
+# How to run it?
+# > python tools/rollout_script.py inventory.txt 1 ble/ble-shelly-motion.shelly.js
+# > python tools/rollout_script.py inventory.txt 1 script.shelly.js --waves 1,10,50 --concurrency 8 --per-subnet 2
+# > python tools/rollout_script.py inventory.txt 1 script.shelly.js --bandwidth 20000 --max-failure-rate 0.1 --on-failure halt
+# > Exit code 0 = rollout completed, exit code 1 = rollout halted or failed
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+import ipaddress
+import json
+import os
+import sys
+import threading
+import time
+
+from fleet import CHUNK_SIZE, RpcError, call_rpc, duplicate_labels, read_code, read_inventory
+
+DEFAULT_CACHE = "rollout-cache"
+
+
+def subnet_of(host, prefix):
+    """Return the subnet key of a host; hostnames are their own subnet."""
+    address = host.rsplit(":", 1)[0] if host.count(":") == 1 else host
+    try:
+        return str(ipaddress.ip_network(f"{address}/{prefix}", strict=False))
+    except ValueError:
+        return address
+
+
+def plan_waves(devices, sizes):
+    """Split devices into waves; the last size repeats until all are planned."""
+    waves = []
+    pos = 0
+    idx = 0
+    while pos < len(devices):
+        size = sizes[min(idx, len(sizes) - 1)]
+        waves.append(devices[pos:pos + size])
+        pos += size
+        idx += 1
+    return waves
+
+
+class RateLimiter:
+    """Token bucket shared by all transfers (bytes per second, 0 = unlimited)."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.allowance = rate
+        self.last = time.monotonic()
+
+    def acquire(self, amount):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.allowance = min(self.rate, self.allowance + (now - self.last) * self.rate)
+                self.last = now
+                # Chunks larger than one second of budget still pass once full
+                if self.allowance >= min(amount, self.rate):
+                    self.allowance -= amount
+                    return
+                wait = (min(amount, self.rate) - self.allowance) / self.rate
+            time.sleep(wait)
+
+
+class Rollout:
+    """Shared limits and settings for one rollout run."""
+
+    def __init__(self, args, code, name):
+        self.args = args
+        self.code = code
+        self.name = name
+        self.limiter = RateLimiter(args.bandwidth)
+        self.subnet_lock = threading.Lock()
+        self.subnet_slots = {}
+        self.touched = set()
+
+    def subnet_slot(self, host):
+        key = subnet_of(host, self.args.subnet_prefix)
+        with self.subnet_lock:
+            if key not in self.subnet_slots:
+                self.subnet_slots[key] = threading.Semaphore(self.args.per_subnet)
+            return self.subnet_slots[key]
+
+    def cache_path(self, device):
+        return os.path.join(self.args.cache, f"{device['label']}.{self.args.id}")
+
+    def upload(self, host, code):
+        pos = 0
+        append = False
+        while pos < len(code) or not append:
+            chunk = code[pos:pos + CHUNK_SIZE]
+            self.limiter.acquire(len(chunk.encode("utf-8")))
+            call_rpc(host, "Script.PutCode", {"id": self.args.id, "code": chunk, "append": append})
+            pos += len(chunk)
+            append = True
+
+    def check_health(self, host):
+        """Return None when the script runs without errors, else the reason."""
+        time.sleep(self.args.settle)
+        status = call_rpc(host, "Script.GetStatus", {"id": self.args.id})
+        if status.get("errors"):
+            return f"script errors: {', '.join(str(e) for e in status['errors'])}"
+        if not status.get("running"):
+            return "script is not running"
+        return None
+
+    def deploy(self, device):
+        """Deploy to one device. Returns None on success, else the reason."""
+        host = device["host"]
+        with self.subnet_slot(host):
+            previous_code = read_code(host, self.args.id, on_chunk=self.limiter.acquire)
+            # A device already running the new code was updated by an earlier
+            # (halted) run; its cache entry still holds the real previous code
+            cached = all(os.path.isfile(self.cache_path(device) + ext) for ext in (".js", ".json"))
+            if previous_code != self.code or not cached:
+                status = call_rpc(host, "Script.GetStatus", {"id": self.args.id})
+                config = call_rpc(host, "Script.GetConfig", {"id": self.args.id})
+                os.makedirs(self.args.cache, exist_ok=True)
+                with open(self.cache_path(device) + ".js", mode="w", encoding="utf-8", newline="") as f:
+                    f.write(previous_code)
+                with open(self.cache_path(device) + ".json", mode="w", encoding="utf-8") as f:
+                    json.dump({"name": config.get("name"), "running": bool(status.get("running"))}, f)
+            with self.subnet_lock:
+                self.touched.add(device["label"])
+
+            call_rpc(host, "Script.Stop", {"id": self.args.id})
+            call_rpc(host, "Script.SetConfig", {"id": self.args.id, "config": {"name": self.name}})
+            self.upload(host, self.code)
+            call_rpc(host, "Script.Start", {"id": self.args.id})
+        return self.check_health(host)
+
+    def rollback(self, device):
+        """Restore the cached previous code, name and running state.
+
+        Returns None on success, else the reason; a script that was running
+        before must pass the health check again.
+        """
+        host = device["host"]
+        with open(self.cache_path(device) + ".js", mode="r", encoding="utf-8", newline="") as f:
+            code = f.read()
+        with open(self.cache_path(device) + ".json", mode="r", encoding="utf-8") as f:
+            previous = json.load(f)
+        with self.subnet_slot(host):
+            call_rpc(host, "Script.Stop", {"id": self.args.id})
+            call_rpc(host, "Script.SetConfig", {"id": self.args.id, "config": {"name": previous.get("name")}})
+            self.upload(host, code)
+            if previous.get("running"):
+                call_rpc(host, "Script.Start", {"id": self.args.id})
+        if previous.get("running"):
+            reason = self.check_health(host)
+            if reason:
+                return f"restored, but {reason}"
+        return None
+
+
+def run_parallel(fn, devices, workers):
+    """Run fn for each device; returns list of (device, error or None)."""
+    def wrapped(device):
+        try:
+            return fn(device)
+        except (RpcError, OSError, ValueError) as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(zip(devices, pool.map(wrapped, devices)))
+
+
+def report_restore_failures(devices):
+    """Print the devices left broken by a failed rollback; True if any."""
+    if not devices:
+        return False
+    print(f"\n[FAIL] {len(devices)} device(s) could not be restored, check manually:")
+    for device in devices:
+        print(f"  [X] {device['label']} ({device['host']})")
+    return True
+
+
+def parse_waves(value):
+    try:
+        sizes = [int(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        sizes = []
+    if not sizes or any(s < 1 for s in sizes):
+        raise ValueError(f"Invalid wave sizes: {value}")
+    return sizes
+
+
+def main():
+    argparser = ArgumentParser(description="Deploy a script to many Shelly devices in health-gated waves")
+    argparser.add_argument("inventory", help="Inventory file, one device per line: <host> [label]")
+    argparser.add_argument("id", type=int, help="ID of the script slot on the devices")
+    argparser.add_argument("file", help="Local file containing the script code to deploy")
+    argparser.add_argument("--waves", default="1,10", help="Comma-separated wave sizes; the last one repeats (default: 1,10)")
+    argparser.add_argument("--concurrency", type=int, default=8, help="Devices updated in parallel overall (default: 8)")
+    argparser.add_argument("--per-subnet", type=int, default=2, help="Devices updated in parallel per subnet (default: 2)")
+    argparser.add_argument("--subnet-prefix", type=int, default=24, help="Prefix length used to group devices into subnets (default: 24)")
+    argparser.add_argument("--bandwidth", type=int, default=0, help="Global transfer budget in bytes/s, 0 = unlimited (default: 0)")
+    argparser.add_argument("--settle", type=float, default=3.0, help="Seconds to wait after Script.Start before the health check (default: 3)")
+    argparser.add_argument("--max-failure-rate", type=float, default=0.0, help="Highest tolerated failed fraction of a wave (default: 0)")
+    argparser.add_argument("--on-failure", choices=("rollback", "halt"), default="rollback", help="Action when a wave exceeds the failure rate (default: rollback)")
+    argparser.add_argument("--cache", default=DEFAULT_CACHE, help=f"Directory for the previous code of each device (default: {DEFAULT_CACHE})")
+
+    args = argparser.parse_args()
+
+    for path in (args.inventory, args.file):
+        if not os.path.isfile(path):
+            print(f"ERROR: Cannot find the file: {path}")
+            return 1
+
+    try:
+        sizes = parse_waves(args.waves)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        return 1
+
+    devices = read_inventory(args.inventory)
+    if not devices:
+        print(f"ERROR: No devices in inventory: {args.inventory}")
+        return 1
+
+    # The cache is keyed by label, so two devices must not share one
+    duplicates = duplicate_labels(devices)
+    if duplicates:
+        print(f"ERROR: Duplicate device labels in inventory: {', '.join(duplicates)}")
+        return 1
+
+    with open(args.file, mode="r", encoding="utf-8") as f:
+        code = f.read()
+
+    rollout = Rollout(args, code, os.path.basename(args.file))
+    waves = plan_waves(devices, sizes)
+    done = []
+    restore_failed = []
+
+    print(f"Rolling out {args.file} to {len(devices)} device(s) in {len(waves)} wave(s)")
+    for number, wave in enumerate(waves, 1):
+        print(f"\nWave {number}/{len(waves)}: {len(wave)} device(s)")
+        results = run_parallel(rollout.deploy, wave, args.concurrency)
+        failed = [(d, err) for d, err in results if err]
+        for device, err in results:
+            if err:
+                print(f"  [X] {device['label']}: {err}")
+            else:
+                print(f"  [OK] {device['label']}")
+
+        rate = len(failed) / len(wave)
+        halt = rate > args.max_failure_rate
+        if halt:
+            print(f"\n[FAIL] Wave {number} failure rate {rate:.0%} exceeds {args.max_failure_rate:.0%}, halting rollout")
+            restore = wave if args.on_failure == "rollback" else []
+        else:
+            done.extend(d for d, err in results if not err)
+            # Tolerated failures are still restored rather than left broken
+            restore = [d for d, err in failed] if args.on_failure == "rollback" else []
+
+        # Devices whose previous code never reached the cache were not changed
+        restore = [d for d in restore if d["label"] in rollout.touched]
+        if restore:
+            print(f"Rolling back {len(restore)} device(s) of wave {number}")
+            for device, err in run_parallel(rollout.rollback, restore, args.concurrency):
+                if err:
+                    restore_failed.append(device)
+                    print(f"  [X] {device['label']}: rollback failed: {err}")
+                else:
+                    print(f"  [OK] {device['label']}: restored")
+
+        if halt:
+            print(f"\nUpdated before halt: {len(done)}/{len(devices)} device(s)")
+            report_restore_failures(restore_failed)
+            return 1
+
+    if report_restore_failures(restore_failed):
+        return 1
+    if len(done) < len(devices):
+        print(f"\n[WARN] Rolled out to {len(done)}/{len(devices)} device(s)")
+    else:
+        print(f"\n[OK] Rolled out to {len(done)}/{len(devices)} device(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())